@@ -1,7 +1,34 @@
+import threading
+
 import click
 from dotenv import load_dotenv
 
-from compendiumkeeper.indexer import index_compendium
+from compendiumkeeper.embeddings.base import EmbeddingProvider
+from compendiumkeeper.embeddings.local_provider import LocalEmbeddingProvider
+from compendiumkeeper.embeddings.openai_provider import OpenAIEmbeddingProvider
+from compendiumkeeper.indexer import (
+    compile_compendium,
+    delete_domain,
+    index_compendium,
+)
+from compendiumkeeper.vector_db.pinecone_db import PineconeDB
+from compendiumkeeper.watcher import CompendiumWatcher, create_status_server
+
+
+def create_embedding_provider(
+    provider_type: str, model: str | None, workers: int | None
+) -> EmbeddingProvider:
+    """Create the embedding provider selected on the command line."""
+    if provider_type == "openai":
+        if model:
+            return OpenAIEmbeddingProvider(model=model)
+        return OpenAIEmbeddingProvider()
+    elif provider_type == "local":
+        if model:
+            return LocalEmbeddingProvider(model=model, workers=workers)
+        return LocalEmbeddingProvider(workers=workers)
+    else:
+        raise RuntimeError(f"Unsupported embedding provider: {provider_type}")
 
 
 @click.group()
@@ -12,28 +39,254 @@ def main():
 
 @main.command("index")
 @click.option(
-    "--compendium-file", "-c", required=True, help="Path to the Compendium pickle file."
+    "--compendium-file",
+    "-c",
+    required=True,
+    help="Path to the Compendium file (pickle, XML or compiled).",
 )
 @click.option(
     "--index-name", "-i", required=True, help="Name of the vector database index."
 )
-def index_cmd(compendium_file, index_name):
+@click.option(
+    "--namespace-per-domain",
+    is_flag=True,
+    help="Write the domain to its own namespace instead of replacing the whole index.",
+)
+@click.option(
+    "--embedding-provider",
+    type=click.Choice(["openai", "local"]),
+    default="openai",
+    show_default=True,
+    help="Generate embeddings with the OpenAI API or a local CPU model.",
+)
+@click.option(
+    "--embedding-model",
+    default=None,
+    help="Embedding model name. Defaults to the provider's default model.",
+)
+@click.option(
+    "--embedding-workers",
+    type=int,
+    default=None,
+    help="Worker processes for the local provider. Defaults to the number of cores.",
+)
+@click.option(
+    "--previous-compendium-file",
+    "-p",
+    default=None,
+    help="Compiled previous version of the Compendium. Only changed concepts are "
+    "re-indexed. Requires --namespace-per-domain.",
+)
+def index_cmd(
+    compendium_file,
+    index_name,
+    namespace_per_domain,
+    embedding_provider,
+    embedding_model,
+    embedding_workers,
+    previous_compendium_file,
+):
     """
     Index a Compendium into a vector database.
     """
     # Load environment variables from the .env file automatically
     load_dotenv()
 
+    provider = None
     try:
+        provider = create_embedding_provider(
+            embedding_provider, embedding_model, embedding_workers
+        )
         index_compendium(
             compendium_file=compendium_file,
             vector_db_type="pinecone",
             index_name=index_name,
+            namespace_per_domain=namespace_per_domain,
+            embedding_provider=provider,
+            previous_compendium_file=previous_compendium_file,
         )
         click.secho("Indexing complete!", fg="green")
     except Exception as e:
         click.secho(f"Error: {e}", fg="red", err=True)
-        SystemExit(1)
+        raise SystemExit(1)
+    finally:
+        if provider is not None:
+            provider.close()
+
+
+@main.command("compile")
+@click.option(
+    "--compendium-file",
+    "-c",
+    required=True,
+    help="Path to the Compendium pickle or XML file.",
+)
+@click.option(
+    "--output-file",
+    "-o",
+    default=None,
+    help="Path of the compiled file. Defaults to the input path with a "
+    ".compendium.bin suffix.",
+)
+def compile_cmd(compendium_file, output_file):
+    """
+    Compile a Compendium into a compact, memory-mappable file.
+    """
+    try:
+        output_file = compile_compendium(compendium_file, output_file)
+        click.secho(f"Compiled to '{output_file}'.", fg="green")
+    except Exception as e:
+        click.secho(f"Error: {e}", fg="red", err=True)
+        raise SystemExit(1)
+
+
+@main.command("delete-domain")
+@click.option(
+    "--domain-name", "-d", required=True, help="Name of the domain to delete."
+)
+@click.option(
+    "--index-name", "-i", required=True, help="Name of the vector database index."
+)
+def delete_domain_cmd(domain_name, index_name):
+    """
+    Delete a domain that was indexed with --namespace-per-domain.
+    """
+    load_dotenv()
+
+    try:
+        delete_domain(
+            domain_name=domain_name,
+            vector_db_type="pinecone",
+            index_name=index_name,
+        )
+        click.secho("Deletion complete!", fg="green")
+    except Exception as e:
+        click.secho(f"Error: {e}", fg="red", err=True)
+        raise SystemExit(1)
+
+
+@main.command("watch")
+@click.argument(
+    "directory", type=click.Path(exists=True, file_okay=False, dir_okay=True)
+)
+@click.option(
+    "--index-name", "-i", required=True, help="Name of the vector database index."
+)
+@click.option(
+    "--debounce",
+    default=2.0,
+    show_default=True,
+    help="Seconds a file must stay unchanged before it is indexed.",
+)
+@click.option(
+    "--poll-interval",
+    default=1.0,
+    show_default=True,
+    help="Seconds between directory scans.",
+)
+@click.option(
+    "--workers", default=1, show_default=True, help="Number of indexing workers."
+)
+@click.option(
+    "--status-port",
+    default=8765,
+    show_default=True,
+    help="Port for the local status endpoint (0 to disable).",
+)
+@click.option(
+    "--index-existing",
+    is_flag=True,
+    help="Also index the Compendium files already in the directory at startup.",
+)
+@click.option(
+    "--embedding-provider",
+    type=click.Choice(["openai", "local"]),
+    default="openai",
+    show_default=True,
+    help="Generate embeddings with the OpenAI API or a local CPU model.",
+)
+@click.option(
+    "--embedding-model",
+    default=None,
+    help="Embedding model name. Defaults to the provider's default model.",
+)
+@click.option(
+    "--embedding-workers",
+    type=int,
+    default=None,
+    help="Worker processes for the local provider. Defaults to the number of cores.",
+)
+def watch_cmd(
+    directory,
+    index_name,
+    debounce,
+    poll_interval,
+    workers,
+    status_port,
+    index_existing,
+    embedding_provider,
+    embedding_model,
+    embedding_workers,
+):
+    """
+    Watch a directory and index new or changed Compendia as they land.
+    Each domain is written to its own namespace.
+    """
+    load_dotenv()
+
+    provider = None
+    try:
+        provider = create_embedding_provider(
+            embedding_provider, embedding_model, embedding_workers
+        )
+        vector_db = PineconeDB(
+            index_name=index_name, clear_existing=False, dimension=provider.dimension
+        )
+    except Exception as e:
+        click.secho(f"Error: {e}", fg="red", err=True)
+        if provider is not None:
+            provider.close()
+        raise SystemExit(1)
+
+    watcher = CompendiumWatcher(
+        directory=directory,
+        index_name=index_name,
+        vector_db=vector_db,
+        debounce=debounce,
+        poll_interval=poll_interval,
+        workers=workers,
+        embedding_provider=provider,
+    )
+    if not index_existing:
+        watcher.mark_existing_as_indexed()
+
+    status_server = None
+    if status_port:
+        try:
+            status_server = create_status_server(watcher, port=status_port)
+        except Exception as e:
+            click.secho(
+                f"Error starting status server on port {status_port}: {e}",
+                fg="red",
+                err=True,
+            )
+            provider.close()
+            raise SystemExit(1)
+        threading.Thread(target=status_server.serve_forever, daemon=True).start()
+        click.echo(f"Status available at http://127.0.0.1:{status_port}/status")
+
+    watcher.start()
+    click.secho(f"Watching '{directory}'. Press Ctrl+C to stop.", fg="green")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        click.echo("Stopping...")
+    finally:
+        watcher.stop()
+        provider.close()
+        if status_server is not None:
+            status_server.shutdown()
+            status_server.server_close()
 
 
 if __name__ == "__main__":
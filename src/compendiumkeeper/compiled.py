@@ -0,0 +1,256 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import uuid
+
+from compendiumscribe.model import Domain, Topic, Concept
+from compendiumkeeper.utils import generate_concept_id
+
+COMPILED_SUFFIX = ".compendium.bin"
+
+MAGIC = b"CKCOMPND"
+VERSION = 1
+
+# magic, version, reserved, concept count, metadata length
+PREAMBLE = struct.Struct("<8sHHII")
+# topic index, record offset, record length, content hash, concept ID length
+TABLE_ENTRY = struct.Struct("<IQI32sH")
+
+
+def encode_concept(concept: Concept) -> bytes:
+    """Serialize a concept to the JSON record stored in a compiled file."""
+    record = {
+        "name": concept.name,
+        "content": concept.content,
+        "questions": list(concept.questions),
+        "keywords": list(concept.keywords),
+        "prerequisites": list(concept.prerequisites),
+    }
+    return json.dumps(record, separators=(",", ":"), sort_keys=True).encode("utf-8")
+
+
+def decode_concept(data: bytes) -> Concept:
+    """Deserialize a concept from its JSON record."""
+    record = json.loads(data)
+    concept = Concept(name=record["name"])
+    concept.content = record["content"]
+    concept.questions.extend(record["questions"])
+    concept.keywords.extend(record["keywords"])
+    concept.prerequisites.extend(record["prerequisites"])
+    return concept
+
+
+def hash_concept(topic_summary: str, concept: Concept) -> bytes:
+    """
+    Hash the parts of a concept that are embedded: its name, content, questions
+    and keywords, plus the topic summary that is prepended to its content.
+    Prerequisites are left out, so editing them does not trigger a re-embed.
+    """
+    embedded = {
+        "topic_summary": topic_summary or "",
+        "name": concept.name,
+        "content": concept.content,
+        "questions": list(concept.questions),
+        "keywords": list(concept.keywords),
+    }
+    data = json.dumps(embedded, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(data.encode("utf-8")).digest()
+
+
+def write_compiled(domain: Domain, output_file: str):
+    """
+    Write a Domain to a compiled Compendium file.
+
+    The file consists of a fixed preamble, a JSON block with the domain and
+    topic metadata, an offset table with one entry per concept (keyed by
+    concept ID, with a content hash), and finally the concept records.
+
+    The file is written under a temporary name and then moved into place, so
+    a process that has the old file memory-mapped keeps reading the old file.
+    """
+    metadata = json.dumps(
+        {
+            "name": domain.name,
+            "summary": domain.summary,
+            "topics": [
+                {"name": topic.name, "topic_summary": topic.topic_summary}
+                for topic in domain.topics
+            ],
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+    entries = []
+    records = []
+    for topic_index, topic in enumerate(domain.topics):
+        for concept in topic.concepts:
+            concept_id = generate_concept_id(topic.name, concept.name).encode("utf-8")
+            record = encode_concept(concept)
+            entries.append(
+                (topic_index, concept_id, hash_concept(topic.topic_summary, concept))
+            )
+            records.append(record)
+
+    table_size = sum(TABLE_ENTRY.size + len(entry[1]) for entry in entries)
+    offset = PREAMBLE.size + len(metadata) + table_size
+
+    # Truncating a file that is memory-mapped elsewhere crashes the reader
+    # with SIGBUS, so never rewrite the target in place
+    temp_file = f"{output_file}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temp_file, "xb") as f:
+            f.write(PREAMBLE.pack(MAGIC, VERSION, 0, len(entries), len(metadata)))
+            f.write(metadata)
+            for (topic_index, concept_id, content_hash), record in zip(
+                entries, records
+            ):
+                f.write(
+                    TABLE_ENTRY.pack(
+                        topic_index, offset, len(record), content_hash, len(concept_id)
+                    )
+                )
+                f.write(concept_id)
+                offset += len(record)
+            for record in records:
+                f.write(record)
+        os.replace(temp_file, output_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.unlink(temp_file)
+        raise
+
+
+class CompiledCompendium:
+    """
+    Read-only, memory-mapped view of a compiled Compendium file.
+
+    Only the preamble, metadata and offset table are parsed on open. Concept
+    records are decoded on demand, so memory use stays proportional to the
+    concepts that are actually read.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._mmap = None
+        try:
+            with open(filepath, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._read_header()
+        except Exception as e:
+            self.close()
+            raise RuntimeError(
+                f"Error reading compiled Compendium file '{filepath}': {e}"
+            )
+
+    def _read_header(self):
+        magic, version, _, concept_count, metadata_length = PREAMBLE.unpack_from(
+            self._mmap, 0
+        )
+        if magic != MAGIC:
+            raise ValueError("Not a compiled Compendium file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported compiled Compendium version {version}")
+
+        position = PREAMBLE.size
+        metadata = json.loads(self._mmap[position : position + metadata_length])
+        position += metadata_length
+
+        self.name = metadata["name"]
+        self.summary = metadata["summary"]
+        self._topics = metadata["topics"]
+
+        # Entries are (concept_id, topic_index, offset, length, content_hash)
+        self._entries = []
+        self._entries_by_id = {}
+        for _ in range(concept_count):
+            topic_index, offset, length, content_hash, id_length = (
+                TABLE_ENTRY.unpack_from(self._mmap, position)
+            )
+            position += TABLE_ENTRY.size
+            concept_id = self._mmap[position : position + id_length].decode("utf-8")
+            position += id_length
+
+            entry = (concept_id, topic_index, offset, length, content_hash)
+            self._entries.append(entry)
+            self._entries_by_id[concept_id] = entry
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, concept_id: str) -> bool:
+        return concept_id in self._entries_by_id
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+
+    def concept_ids(self) -> list[str]:
+        """Return the IDs of all concepts, in file order."""
+        return [entry[0] for entry in self._entries]
+
+    def content_hashes(self) -> dict[str, bytes]:
+        """Return the content hash of every concept, keyed by concept ID."""
+        return {concept_id: entry[4] for concept_id, entry in self._entries_by_id.items()}
+
+    def get_concept(self, concept_id: str) -> Concept:
+        """Decode a single concept, without reading any other record."""
+        try:
+            entry = self._entries_by_id[concept_id]
+        except KeyError:
+            raise KeyError(f"No concept '{concept_id}' in '{self.filepath}'")
+        return self._read_concept(entry)
+
+    def _read_concept(self, entry) -> Concept:
+        _, _, offset, length, _ = entry
+        return decode_concept(self._mmap[offset : offset + length])
+
+    def iter_topics(self, concept_ids: set[str] | None = None):
+        """
+        Lazily yield each topic with its concepts loaded, one topic at a time.
+
+        If concept_ids is given, only those concepts are loaded, and topics
+        with none of them are skipped.
+        """
+        topic_entries = [[] for _ in self._topics]
+        for entry in self._entries:
+            if concept_ids is None or entry[0] in concept_ids:
+                topic_entries[entry[1]].append(entry)
+
+        for topic_metadata, entries in zip(self._topics, topic_entries):
+            if concept_ids is not None and not entries:
+                continue
+            yield Topic(
+                name=topic_metadata["name"],
+                topic_summary=topic_metadata["topic_summary"],
+                concepts=[self._read_concept(entry) for entry in entries],
+            )
+
+    def to_domain(self) -> Domain:
+        """Decode the whole file into a Domain object."""
+        return Domain(name=self.name, summary=self.summary, topics=list(self.iter_topics()))
+
+    def diff(self, previous: "CompiledCompendium") -> tuple[set[str], set[str]]:
+        """
+        Compare against a previous version of the same Compendium.
+
+        Returns:
+            tuple: (IDs of concepts that are new or whose content changed,
+                IDs of concepts that were removed)
+        """
+        previous_hashes = previous.content_hashes()
+        current_hashes = self.content_hashes()
+        changed = {
+            concept_id
+            for concept_id, content_hash in current_hashes.items()
+            if previous_hashes.get(concept_id) != content_hash
+        }
+        removed = set(previous_hashes) - set(current_hashes)
+        return changed, removed
@@ -0,0 +1,26 @@
+from abc import ABC, abstractmethod
+
+
+class EmbeddingProvider(ABC):
+    @property
+    @abstractmethod
+    def dimension(self) -> int:
+        """The length of the embeddings this provider produces."""
+        pass
+
+    @abstractmethod
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """
+        Generate embeddings for a list of texts.
+
+        Args:
+            texts (list of str): The texts to embed.
+
+        Returns:
+            list of list of float: One embedding per text, in the same order.
+        """
+        pass
+
+    def close(self):
+        """Release any resources (clients, worker processes) held by the provider."""
+        pass
@@ -0,0 +1,158 @@
+import importlib.util
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from compendiumkeeper.embeddings.base import EmbeddingProvider
+
+# Per-process model, loaded once by each worker's initializer
+_worker_model = None
+
+
+def _init_worker(model_name: str):
+    global _worker_model
+    from sentence_transformers import SentenceTransformer
+
+    # Parallelism comes from the process pool, so keep each worker to one thread
+    try:
+        import torch
+
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+    _worker_model = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_batch(texts: list[str]) -> tuple[list[list[float]], int]:
+    """Encode a batch, also returning how many texts the model truncated."""
+    embeddings = _worker_model.encode(
+        texts, batch_size=len(texts), convert_to_numpy=True
+    )
+    token_ids = _worker_model.tokenizer(texts, verbose=False)["input_ids"]
+    truncated = sum(len(ids) > _worker_model.max_seq_length for ids in token_ids)
+    return embeddings.tolist(), truncated
+
+
+def _get_dimension() -> int:
+    return _worker_model.get_sentence_embedding_dimension()
+
+
+def _get_max_seq_length() -> int:
+    return _worker_model.max_seq_length
+
+
+def make_length_batches(
+    texts: list[str], max_batch_size: int, max_batch_chars: int
+) -> list[list[int]]:
+    """
+    Group text indexes into batches of similar length, so that little padding
+    is wasted when each batch is encoded.
+
+    Texts are sorted by length, then packed greedily while the padded size of
+    the batch (its size times its longest text) stays within max_batch_chars.
+    Character count stands in for sequence length, which avoids tokenizing in
+    the parent process.
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+
+    batches = []
+    batch = []
+    for i in order:
+        # Sorted ascending, so the newest text is always the longest in the batch
+        padded_size = (len(batch) + 1) * len(texts[i])
+        if batch and (len(batch) >= max_batch_size or padded_size > max_batch_chars):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    def __init__(
+        self,
+        model: str = "sentence-transformers/all-MiniLM-L6-v2",
+        workers: int | None = None,
+        max_batch_size: int = 64,
+        max_batch_chars: int = 32768,
+    ):
+        """
+        Initialize a provider that runs a sentence-transformers model on the CPU.
+
+        The model is loaded once in each worker process, and the pool is kept
+        alive until close() is called.
+
+        Args:
+            model (str): Name or path of the sentence-transformers model.
+            workers (int or None): Number of worker processes. Defaults to the
+                number of CPU cores.
+            max_batch_size (int): Maximum number of texts per batch.
+            max_batch_chars (int): Maximum padded size of a batch, in characters.
+        """
+        self.model = model
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch_size = max_batch_size
+        self.max_batch_chars = max_batch_chars
+        self._pool = None
+        self._dimension = None
+        self._max_seq_length = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Fail early here, rather than with a broken pool in the workers
+            if importlib.util.find_spec("sentence_transformers") is None:
+                raise RuntimeError(
+                    "The local embedding provider requires sentence-transformers. "
+                    "Install it with: pip install 'compendiumkeeper[local]'"
+                )
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.model,),
+            )
+        return self._pool
+
+    @property
+    def dimension(self) -> int:
+        if self._dimension is None:
+            self._dimension = self.pool.submit(_get_dimension).result()
+        return self._dimension
+
+    @property
+    def max_seq_length(self) -> int:
+        """The number of tokens beyond which the model truncates its input."""
+        if self._max_seq_length is None:
+            self._max_seq_length = self.pool.submit(_get_max_seq_length).result()
+        return self._max_seq_length
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        batches = make_length_batches(
+            texts, self.max_batch_size, self.max_batch_chars
+        )
+        results = self.pool.map(
+            _encode_batch, [[texts[i] for i in batch] for batch in batches]
+        )
+
+        # Put the embeddings back into the order of the input texts
+        embeddings = [None] * len(texts)
+        truncated = 0
+        for batch, (batch_embeddings, batch_truncated) in zip(batches, results):
+            for i, embedding in zip(batch, batch_embeddings):
+                embeddings[i] = embedding
+            truncated += batch_truncated
+
+        # The end of a truncated text is silently left out of its embedding
+        if truncated:
+            print(
+                f"Warning: {truncated} of {len(texts)} texts exceed the "
+                f"{self.max_seq_length}-token limit of '{self.model}' and were "
+                "truncated. Consider a model with a longer context."
+            )
+        return embeddings
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,78 @@
+from compendiumkeeper.embeddings.base import EmbeddingProvider
+from compendiumkeeper.utils import get_openai_api_key, get_openai_client
+
+
+MODEL_DIMENSIONS = {
+    "text-embedding-ada-002": 1536,
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+
+
+def make_request_batches(
+    texts: list[str], max_batch_size: int, max_batch_chars: int
+) -> list[list[str]]:
+    """
+    Split texts, in order, into batches of at most max_batch_size texts and
+    max_batch_chars characters in total. A single text longer than
+    max_batch_chars gets a batch of its own.
+    """
+    batches = []
+    batch = []
+    batch_chars = 0
+    for text in texts:
+        if batch and (
+            len(batch) >= max_batch_size or batch_chars + len(text) > max_batch_chars
+        ):
+            batches.append(batch)
+            batch = []
+            batch_chars = 0
+        batch.append(text)
+        batch_chars += len(text)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    # The embeddings endpoint accepts at most this many inputs per request
+    max_batch_size = 2048
+    # It also caps the total tokens per request (300,000). Characters stand in
+    # for tokens, which avoids tokenizing here; a token is rarely shorter than
+    # one character, so this stays under the cap even for non-English text.
+    max_batch_chars = 250_000
+
+    def __init__(
+        self, model: str = "text-embedding-ada-002", dimension: int | None = None
+    ):
+        """
+        Initialize the provider for the given OpenAI embedding model.
+
+        Args:
+            model (str): Name of the OpenAI embedding model.
+            dimension (int or None): Length of the embeddings the model produces.
+                Only needed for models not listed in MODEL_DIMENSIONS.
+        """
+        if dimension is None:
+            if model not in MODEL_DIMENSIONS:
+                raise RuntimeError(
+                    f"Unknown dimension for OpenAI embedding model '{model}'."
+                )
+            dimension = MODEL_DIMENSIONS[model]
+
+        self.model = model
+        self._dimension = dimension
+        self.client = get_openai_client(get_openai_api_key())
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        embeddings = []
+        for batch in make_request_batches(
+            texts, self.max_batch_size, self.max_batch_chars
+        ):
+            response = self.client.embeddings.create(model=self.model, input=batch)
+            embeddings.extend(item.embedding for item in response.data)
+        return embeddings
@@ -1,45 +1,251 @@
 import pickle
 import xml.etree.ElementTree as ET
+from contextlib import ExitStack
 
 from compendiumscribe.model import Domain, Topic, Concept
-from compendiumkeeper.utils import get_embedding_data
+from compendiumkeeper.compiled import (
+    COMPILED_SUFFIX,
+    CompiledCompendium,
+    write_compiled,
+)
+from compendiumkeeper.embeddings.base import EmbeddingProvider
+from compendiumkeeper.utils import get_embedding_data_batch, namespace_for_domain
+from compendiumkeeper.vector_db.base import VectorDatabase
 from compendiumkeeper.vector_db.pinecone_db import PineconeDB
 
 
-def index_compendium(compendium_file: str, vector_db_type: str, index_name: str):
+# Number of concepts whose texts are embedded together in one provider call,
+# large enough to keep every worker of a local provider busy
+EMBEDDING_WINDOW_SIZE = 256
+
+
+def iter_concept_windows(topics, window_size: int):
+    """
+    Yield (concept, topic_summary, topic_name) tuples from the given topics,
+    in lists of up to window_size, crossing topic boundaries.
+    """
+    window = []
+    for topic in topics:
+        for concept in topic.concepts:
+            window.append((concept, topic.topic_summary, topic.name))
+            if len(window) >= window_size:
+                yield window
+                window = []
+    if window:
+        yield window
+
+
+def index_compendium(
+    compendium_file: str,
+    vector_db_type: str,
+    index_name: str,
+    namespace_per_domain: bool = False,
+    vector_db: VectorDatabase | None = None,
+    embedding_provider: EmbeddingProvider | None = None,
+    previous_compendium_file: str | None = None,
+    domain: Domain | None = None,
+):
     """
-    Load a Compendium from either an XML file or a pickle file,
+    Load a Compendium from an XML, pickle or compiled file,
     then index its contents into the specified vector DB index.
+
+    If the caller has already loaded a pickle or XML file, the Domain can be
+    passed as domain so that compendium_file is not read a second time.
+
+    If namespace_per_domain is True, the domain is written to its own namespace
+    (derived from the domain name), and only that namespace is cleared first.
+    Otherwise the whole index is cleared and the default namespace is used.
+
+    An already-initialized vector_db may be passed in to reuse its client
+    across calls; vector_db_type is then ignored.
+
+    If embedding_provider is given, the texts of up to EMBEDDING_WINDOW_SIZE
+    concepts are embedded with it in a single call. Otherwise the OpenAI API is
+    called once per text.
+
+    If previous_compendium_file is given, both files must be compiled and
+    namespace_per_domain must be True. Instead of clearing the namespace, only
+    concepts whose content hash differs from the previous version are
+    re-indexed, then their stale vectors and removed concepts are deleted.
+
+    Returns the number of concepts indexed.
+    """
+    with ExitStack() as stack:
+        compiled = None
+        if domain is not None:
+            pass  # Already loaded by the caller
+        elif compendium_file.endswith(".compendium.pickle"):
+            domain = load_domain_from_pickle(compendium_file)
+        elif compendium_file.endswith(".compendium.xml"):
+            domain = load_domain_from_xml(compendium_file)
+        elif compendium_file.endswith(COMPILED_SUFFIX):
+            compiled = stack.enter_context(CompiledCompendium(compendium_file))
+        else:
+            raise RuntimeError(
+                f"Unknown file format for '{compendium_file}'. "
+                f"Expected .compendium.pickle, .compendium.xml or {COMPILED_SUFFIX}"
+            )
+
+        previous = None
+        if previous_compendium_file is not None:
+            if compiled is None or not previous_compendium_file.endswith(
+                COMPILED_SUFFIX
+            ):
+                raise RuntimeError(
+                    "Incremental indexing requires compiled Compendium files."
+                )
+            if not namespace_per_domain:
+                raise RuntimeError(
+                    "Incremental indexing requires namespace_per_domain."
+                )
+            previous = stack.enter_context(
+                CompiledCompendium(previous_compendium_file)
+            )
+            if namespace_for_domain(previous.name) != namespace_for_domain(
+                compiled.name
+            ):
+                raise RuntimeError(
+                    f"Previous Compendium is for domain '{previous.name}', "
+                    f"not '{compiled.name}'."
+                )
+
+        # Compiled files are read lazily, one topic at a time
+        if compiled is not None:
+            domain_name = compiled.name
+            topics = compiled.iter_topics()
+        else:
+            domain_name = domain.name
+            topics = domain.topics
+
+        # Initialize the vector database client, unless one was provided
+        if vector_db is None:
+            if vector_db_type == "pinecone":
+                db_kwargs = {"index_name": index_name}
+                if namespace_per_domain:
+                    db_kwargs["clear_existing"] = False
+                if embedding_provider is not None:
+                    db_kwargs["dimension"] = embedding_provider.dimension
+                vector_db = PineconeDB(**db_kwargs)
+            else:
+                raise RuntimeError(f"Unsupported vector DB: {vector_db_type}")
+
+        namespace = ""
+        if namespace_per_domain:
+            namespace = namespace_for_domain(domain_name)
+            if previous is None:
+                vector_db.delete_namespace(namespace)
+
+        if previous is not None:
+            changed, removed = compiled.diff(previous)
+            topics = compiled.iter_topics(changed)
+
+        total_concepts = 0
+        for window in iter_concept_windows(topics, EMBEDDING_WINDOW_SIZE):
+            window_embedding_data = get_embedding_data_batch(
+                window, embedding_provider=embedding_provider
+            )
+            for embedding_data in window_embedding_data:
+                vector_db.upsert_concept_embeddings(embedding_data, namespace=namespace)
+                total_concepts += 1
+
+        # Changed concepts were overwritten in place above, so only now delete
+        # what is stale: vectors for questions or keywords a changed concept no
+        # longer has, and removed concepts. If embedding fails partway, the
+        # previous vectors are still there.
+        if previous is not None:
+            for concept_id in sorted(changed & set(previous.concept_ids())):
+                vector_db.delete_concept_embeddings(
+                    concept_id,
+                    previous.get_concept(concept_id),
+                    namespace=namespace,
+                    current_concept=compiled.get_concept(concept_id),
+                )
+            for concept_id in sorted(removed):
+                vector_db.delete_concept_embeddings(
+                    concept_id, previous.get_concept(concept_id), namespace=namespace
+                )
+
+    target = f"index '{index_name}'"
+    if namespace:
+        target += f", namespace '{namespace}'"
+    if previous is not None:
+        print(
+            f"Indexed {total_concepts} changed concepts and removed {len(removed)} "
+            f"concepts from domain '{domain_name}' in {target}."
+        )
+    else:
+        print(f"Indexed {total_concepts} concepts from domain '{domain_name}' into {target}.")
+    return total_concepts
+
+
+def compile_compendium(compendium_file: str, output_file: str | None = None) -> str:
+    """
+    Compile a Compendium from an XML or pickle file into the compiled format,
+    which can be memory-mapped and read one concept at a time.
+
+    If output_file is not given, it is derived from compendium_file.
+    Returns the path of the compiled file.
     """
-    domain = None
     if compendium_file.endswith(".compendium.pickle"):
         domain = load_domain_from_pickle(compendium_file)
+        stem = compendium_file.removesuffix(".compendium.pickle")
     elif compendium_file.endswith(".compendium.xml"):
         domain = load_domain_from_xml(compendium_file)
+        stem = compendium_file.removesuffix(".compendium.xml")
     else:
         raise RuntimeError(
             f"Unknown file format for '{compendium_file}'. "
             "Expected .compendium.pickle or .compendium.xml"
         )
 
-    # Initialize the vector database client
+    if output_file is None:
+        output_file = stem + COMPILED_SUFFIX
+
+    try:
+        write_compiled(domain, output_file)
+    except Exception as e:
+        raise RuntimeError(f"Error writing compiled file '{output_file}': {e}")
+    return output_file
+
+
+def delete_domain(domain_name: str, vector_db_type: str, index_name: str):
+    """
+    Delete a domain that was indexed with namespace_per_domain, leaving the
+    rest of the index untouched.
+    """
+    # Derive the namespace first, so that an invalid name fails before connecting
+    namespace = namespace_for_domain(domain_name)
+
     if vector_db_type == "pinecone":
-        vector_db = PineconeDB(index_name=index_name)
+        vector_db = PineconeDB(index_name=index_name, clear_existing=False)
     else:
         raise RuntimeError(f"Unsupported vector DB: {vector_db_type}")
 
-    total_concepts = 0
-    for topic in domain.topics:
-        for concept in topic.concepts:
-            embedding_data = get_embedding_data(
-                concept, topic_summary=topic.topic_summary, topic_name=topic.name
-            )
-            vector_db.upsert_concept_embeddings(embedding_data)
-            total_concepts += 1
+    vector_db.delete_namespace(namespace)
+    print(f"Deleted domain '{domain_name}' (namespace '{namespace}') from index '{index_name}'.")
 
-    print(
-        f"Indexed {total_concepts} concepts from domain '{domain.name}' into index '{index_name}'."
-    )
+
+def read_domain_name(compendium_file: str) -> str:
+    """
+    Read the domain name of a Compendium file.
+    For XML, only the root element is parsed, and for compiled files only the
+    header is read. A pickle has to be loaded in full; use
+    load_domain_from_pickle instead if the Domain is needed afterwards.
+    """
+    if compendium_file.endswith(COMPILED_SUFFIX):
+        with CompiledCompendium(compendium_file) as compiled:
+            return compiled.name
+    elif compendium_file.endswith(".compendium.pickle"):
+        return load_domain_from_pickle(compendium_file).name
+    elif compendium_file.endswith(".compendium.xml"):
+        try:
+            for _, domain_elem in ET.iterparse(compendium_file, events=("start",)):
+                return domain_elem.attrib.get("name", "")
+        except Exception as e:
+            raise RuntimeError(
+                f"Error reading domain name from XML file '{compendium_file}': {e}"
+            )
+    raise RuntimeError(f"Unknown file format for '{compendium_file}'.")
 
 
 def load_domain_from_pickle(filepath: str) -> Domain:
@@ -52,6 +258,15 @@ def load_domain_from_pickle(filepath: str) -> Domain:
         raise RuntimeError(f"Error loading domain from pickle file '{filepath}': {e}")
 
 
+def load_domain_from_compiled(filepath: str) -> Domain:
+    """
+    Load a Domain object from a compiled file.
+    Use CompiledCompendium directly to read concepts lazily instead.
+    """
+    with CompiledCompendium(filepath) as compiled:
+        return compiled.to_domain()
+
+
 def load_domain_from_xml(filepath: str) -> Domain:
     """
     Load a Domain object from an XML file.
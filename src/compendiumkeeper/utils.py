@@ -1,7 +1,12 @@
+import hashlib
 import re
 import os
+from functools import lru_cache
+
 from openai import OpenAI
 
+from compendiumkeeper.embeddings.base import EmbeddingProvider
+
 
 def slugify(name: str) -> str:
     """Convert a string to snake_case."""
@@ -13,6 +18,21 @@ def generate_concept_id(topic_name: str, concept_name: str) -> str:
     return f"{slugify(topic_name)}_{slugify(concept_name)}"
 
 
+def namespace_for_domain(domain_name: str) -> str:
+    """
+    Derive the vector DB namespace for a domain from its name.
+
+    The slug keeps the namespace readable, and a short hash of the full name
+    keeps names that slugify alike (e.g. "C++" and "C#") apart. Names with no
+    ASCII letters or digits (e.g. "生物学") get the generic slug "domain".
+    """
+    if not domain_name.strip():
+        raise RuntimeError("Cannot derive a namespace from an empty domain name.")
+    slug = slugify(domain_name) or "domain"
+    name_hash = hashlib.sha256(domain_name.strip().encode("utf-8")).hexdigest()[:8]
+    return f"{slug}_{name_hash}"
+
+
 def get_openai_api_key() -> str:
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
@@ -20,40 +40,114 @@ def get_openai_api_key() -> str:
     return api_key
 
 
+@lru_cache(maxsize=1)
+def get_openai_client(api_key: str) -> OpenAI:
+    """
+    Return an OpenAI client for the given API key, reusing it across calls
+    so that connections stay warm.
+    """
+    return OpenAI(api_key=api_key)
+
+
 def get_embedding(text: str) -> list[float]:
     """
     Generate an embedding for the given text using the new OpenAI client.
     """
     api_key = get_openai_api_key()
-    client = OpenAI(api_key=api_key)
+    client = get_openai_client(api_key)
 
     # Create a single embedding
     response = client.embeddings.create(model="text-embedding-ada-002", input=text)
     return response.data[0].embedding
 
 
-def get_embedding_data(concept, topic_summary: str, topic_name: str):
+def embed_texts(
+    texts: list[str], embedding_provider: EmbeddingProvider | None = None
+) -> list[list[float]]:
+    """
+    Embed a list of texts with the given provider, or with get_embedding
+    (one OpenAI request per text) if no provider is given.
+    """
+    if embedding_provider is None:
+        return [get_embedding(text) for text in texts]
+    return embedding_provider.embed(texts)
+
+
+def get_embedding_data(
+    concept,
+    topic_summary: str,
+    topic_name: str,
+    embedding_provider: EmbeddingProvider | None = None,
+):
     """
     Prepare embedding data for a concept, including name, content, questions, keywords,
     and combined keywords.
     """
-    concept_id = generate_concept_id(topic_name, concept.name)
-
-    name_text = concept.name
-    content_text = f"{topic_summary}\n\n{concept.content}"
-    question_texts = concept.questions
-    keyword_texts = concept.keywords
-    combined_keywords = " ".join(keyword_texts) if keyword_texts else None
-
-    return {
-        "concept_id": concept_id,
-        "name": (name_text, get_embedding(name_text)),
-        "content": (content_text, get_embedding(content_text)),
-        "questions": [(q, get_embedding(q)) for q in question_texts],
-        "keywords": [(kw, get_embedding(kw)) for kw in keyword_texts],
-        "combined_keywords": (
-            (combined_keywords, get_embedding(combined_keywords))
-            if combined_keywords
-            else None
-        ),
-    }
+    return get_embedding_data_batch(
+        [(concept, topic_summary, topic_name)], embedding_provider
+    )[0]
+
+
+def get_embedding_data_batch(
+    concepts: list[tuple],
+    embedding_provider: EmbeddingProvider | None = None,
+) -> list[dict]:
+    """
+    Prepare embedding data for several concepts, which may come from different
+    topics, embedding all of their texts in a single call to the provider.
+
+    Args:
+        concepts (list of tuples): [(concept, topic_summary, topic_name), ...]
+    """
+    concept_texts = []
+    all_texts = []
+    for concept, topic_summary, topic_name in concepts:
+        name_text = concept.name
+        content_text = f"{topic_summary}\n\n{concept.content}"
+        question_texts = concept.questions
+        keyword_texts = concept.keywords
+        combined_keywords = " ".join(keyword_texts) if keyword_texts else None
+
+        concept_texts.append(
+            (
+                concept,
+                topic_name,
+                name_text,
+                content_text,
+                question_texts,
+                keyword_texts,
+                combined_keywords,
+            )
+        )
+        all_texts += [name_text, content_text, *question_texts, *keyword_texts]
+        if combined_keywords:
+            all_texts.append(combined_keywords)
+
+    embeddings = iter(embed_texts(all_texts, embedding_provider))
+
+    results = []
+    for (
+        concept,
+        topic_name,
+        name_text,
+        content_text,
+        question_texts,
+        keyword_texts,
+        combined_keywords,
+    ) in concept_texts:
+        # Consume the embeddings in the same order the texts were added
+        results.append(
+            {
+                "concept_id": generate_concept_id(topic_name, concept.name),
+                "name": (name_text, next(embeddings)),
+                "content": (content_text, next(embeddings)),
+                "questions": [(q, next(embeddings)) for q in question_texts],
+                "keywords": [(kw, next(embeddings)) for kw in keyword_texts],
+                "combined_keywords": (
+                    (combined_keywords, next(embeddings))
+                    if combined_keywords
+                    else None
+                ),
+            }
+        )
+    return results
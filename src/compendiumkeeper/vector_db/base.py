@@ -3,7 +3,7 @@ from abc import ABC, abstractmethod
 
 class VectorDatabase(ABC):
     @abstractmethod
-    def upsert_concept_embeddings(self, embedding_data: dict):
+    def upsert_concept_embeddings(self, embedding_data: dict, namespace: str = ""):
         """
         Upsert concept embeddings into the vector database.
 
@@ -15,5 +15,57 @@ class VectorDatabase(ABC):
                 - questions (list of tuples): [(text, embedding), ...]
                 - keywords (list of tuples): [(text, embedding), ...]
                 - combined_keywords (tuple or None): (text, embedding) or None
+            namespace (str): Namespace to write into. The empty string is the
+                default (shared) namespace.
+        """
+        pass
+
+    @abstractmethod
+    def delete_concept_embeddings(
+        self, concept_id: str, concept, namespace: str = "", current_concept=None
+    ):
+        """
+        Delete the embeddings previously upserted for a concept.
+
+        Args:
+            concept_id (str): The concept's ID.
+            concept (Concept): The concept as it was when it was upserted, which
+                determines how many question and keyword vectors it has.
+            namespace (str): Namespace the concept was written to.
+            current_concept (Concept or None): The new version of the concept,
+                if it has already been upserted. Only the vectors it no longer
+                has (e.g. for removed questions) are then deleted.
+        """
+        pass
+
+    @abstractmethod
+    def query(
+        self,
+        embedding: list[float],
+        top_k: int = 10,
+        namespaces: list[str] | None = None,
+    ) -> list[dict]:
+        """
+        Query the vector database for the closest matches to an embedding.
+
+        Args:
+            embedding (list[float]): The query embedding.
+            top_k (int): Maximum number of matches to return.
+            namespaces (list of str or None): Namespaces to search. If None,
+                only the default namespace is searched.
+
+        Returns:
+            list of dict: Matches ordered by descending score, each with
+                "id", "score", "namespace" and "metadata" keys.
+        """
+        pass
+
+    @abstractmethod
+    def delete_namespace(self, namespace: str):
+        """
+        Delete every vector in the given namespace, leaving others untouched.
+
+        Args:
+            namespace (str): The namespace to delete.
         """
         pass
@@ -1,15 +1,27 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+
 from pinecone import Pinecone, ServerlessSpec
 from compendiumkeeper.vector_db.base import VectorDatabase
 
 
 class PineconeDB(VectorDatabase):
-    def __init__(self, index_name: str):
+    # Upper bound on concurrent requests when querying several namespaces
+    max_query_workers = 8
+
+    def __init__(
+        self, index_name: str, clear_existing: bool = True, dimension: int = 1536
+    ):
         """
         Initialize PineconeDB with the specified index configurations.
 
         Args:
             index_name (str): Name of the Pinecone index.
+            clear_existing (bool): Whether to delete all vectors from an existing
+                index. Pass False when writing per-domain namespaces, so that
+                other domains are left in place.
+            dimension (int): Embedding dimension used when creating the index.
+                The default suits text-embedding-ada-002.
         """
         api_key = os.getenv("PINECONE_API_KEY")
         if not api_key:
@@ -19,20 +31,33 @@ class PineconeDB(VectorDatabase):
         self.pinecone = Pinecone(api_key=api_key)
 
         # Hard-coded defaults for this application
-        dimension = 1536  # Suitable for text-embedding-ada-002
         metric = "cosine"
         spec = ServerlessSpec(cloud="aws", region="us-east-1")
 
         existing_indexes = self.pinecone.list_indexes()  # Returns a list of index names
 
-        # If the index already exists, clear it out
+        # If the index already exists, check that it fits our embeddings,
+        # then clear it out (unless asked not to)
         if index_name in existing_indexes:
+            try:
+                index_description = self.pinecone.describe_index(index_name)
+            except Exception as e:
+                raise RuntimeError(
+                    f"Error describing Pinecone index '{index_name}': {e}"
+                )
+            if index_description.dimension != dimension:
+                raise RuntimeError(
+                    f"Pinecone index '{index_name}' has dimension "
+                    f"{index_description.dimension}, but the embeddings have dimension "
+                    f"{dimension}. Use a separate index for each embedding model."
+                )
+            self.index_host = index_description.host
+
+        if index_name in existing_indexes and clear_existing:
             print(
                 f"Pinecone index '{index_name}' already exists. Deleting all vectors..."
             )
             try:
-                index_description = self.pinecone.describe_index(index_name)
-                self.index_host = index_description.host
                 index = self.pinecone.Index(host=self.index_host)
                 index.delete(delete_all=True)
                 print("All vectors deleted.")
@@ -63,7 +88,7 @@ class PineconeDB(VectorDatabase):
         # This references the 'host' we discovered above
         self.index = self.pinecone.Index(host=self.index_host)
 
-    def upsert_concept_embeddings(self, embedding_data: dict):
+    def upsert_concept_embeddings(self, embedding_data: dict, namespace: str = ""):
         vectors = []
         concept_id = embedding_data["concept_id"]
 
@@ -123,7 +148,92 @@ class PineconeDB(VectorDatabase):
             )
 
         try:
-            self.index.upsert(vectors=vectors)
+            self.index.upsert(vectors=vectors, namespace=namespace)
             print(f"Upserted {len(vectors)} vectors for concept '{concept_id}'.")
         except Exception as e:
-            print(f"Error upserting vectors to Pinecone: {e}")
+            raise RuntimeError(
+                f"Error upserting vectors for concept '{concept_id}' to Pinecone: {e}"
+            )
+
+    def concept_vector_ids(self, concept_id: str, concept) -> list[str]:
+        """Return the IDs that upsert_concept_embeddings uses for a concept."""
+        # These IDs must match the ones built in upsert_concept_embeddings
+        vector_ids = [f"{concept_id}_name", f"{concept_id}_content"]
+        vector_ids += [
+            f"{concept_id}_question_{i}" for i in range(len(concept.questions))
+        ]
+        vector_ids += [f"{concept_id}_keyword_{i}" for i in range(len(concept.keywords))]
+        if concept.keywords:
+            vector_ids.append(f"{concept_id}_combined_keywords")
+        return vector_ids
+
+    def delete_concept_embeddings(
+        self, concept_id: str, concept, namespace: str = "", current_concept=None
+    ):
+        vector_ids = self.concept_vector_ids(concept_id, concept)
+        if current_concept is not None:
+            current_ids = set(self.concept_vector_ids(concept_id, current_concept))
+            vector_ids = [i for i in vector_ids if i not in current_ids]
+        if not vector_ids:
+            return
+
+        try:
+            self.index.delete(ids=vector_ids, namespace=namespace)
+            print(f"Deleted {len(vector_ids)} vectors for concept '{concept_id}'.")
+        except Exception as e:
+            raise RuntimeError(
+                f"Error deleting vectors for concept '{concept_id}' from Pinecone: {e}"
+            )
+
+    def query(
+        self,
+        embedding: list[float],
+        top_k: int = 10,
+        namespaces: list[str] | None = None,
+    ) -> list[dict]:
+        if not namespaces:
+            namespaces = [""]
+        # Querying a namespace twice would only duplicate its matches
+        namespaces = list(dict.fromkeys(namespaces))
+
+        def query_namespace(namespace: str) -> list[dict]:
+            response = self.index.query(
+                vector=embedding,
+                top_k=top_k,
+                namespace=namespace,
+                include_metadata=True,
+            )
+            return [
+                {
+                    "id": match.id,
+                    "score": match.score,
+                    "namespace": namespace,
+                    "metadata": match.metadata,
+                }
+                for match in response.matches
+            ]
+
+        # Fan the query out across namespaces concurrently, then merge by score
+        try:
+            max_workers = min(len(namespaces), self.max_query_workers)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(query_namespace, namespaces))
+        except Exception as e:
+            raise RuntimeError(f"Error querying Pinecone: {e}")
+
+        matches = [match for result in results for match in result]
+        matches.sort(key=lambda match: match["score"], reverse=True)
+        return matches[:top_k]
+
+    def delete_namespace(self, namespace: str):
+        try:
+            # Deleting a namespace that doesn't exist is an error in Pinecone
+            existing_namespaces = self.index.describe_index_stats().namespaces
+            if namespace not in existing_namespaces:
+                return
+            self.index.delete(delete_all=True, namespace=namespace)
+            print(f"All vectors deleted from namespace '{namespace}'.")
+        except Exception as e:
+            raise RuntimeError(
+                f"Error deleting vectors from Pinecone namespace '{namespace}': {e}"
+            )
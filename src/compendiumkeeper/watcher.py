@@ -0,0 +1,300 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from compendiumkeeper.compiled import COMPILED_SUFFIX
+from compendiumkeeper.embeddings.base import EmbeddingProvider
+from compendiumkeeper.indexer import (
+    index_compendium,
+    load_domain_from_pickle,
+    read_domain_name,
+)
+from compendiumkeeper.utils import namespace_for_domain
+from compendiumkeeper.vector_db.base import VectorDatabase
+
+COMPENDIUM_SUFFIXES = (".compendium.pickle", ".compendium.xml", COMPILED_SUFFIX)
+
+# Compendium Scribe names its output like cell_biology_2024-12-05.compendium.xml
+FILENAME_DATE = re.compile(r"(\d{4}-\d{2}-\d{2})\.compendium\.")
+
+
+def compendium_recency(path: str, signature: tuple[int, int]) -> tuple[str, int]:
+    """
+    Return a sort key that orders versions of a Compendium from oldest to
+    newest: by the date in the filename, then by modification time.
+    """
+    match = FILENAME_DATE.search(os.path.basename(path))
+    return (match.group(1) if match else "", signature[0])
+
+
+class CompendiumWatcher:
+    """
+    Watch a directory for new or changed Compendium files and index them,
+    reusing a single vector DB client (and embedding provider, if any) for the
+    lifetime of the process.
+
+    Files are polled rather than watched through OS events. A file is only
+    queued once its size and modification time have been stable for
+    `debounce` seconds, so partially written files are not picked up.
+    Each domain is written to its own namespace, so indexing one file never
+    clears the others. Files for the same namespace are indexed one at a time,
+    and a file older than the one last indexed for its namespace is skipped,
+    so the newest version of a domain always wins.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        index_name: str,
+        vector_db: VectorDatabase,
+        debounce: float = 2.0,
+        poll_interval: float = 1.0,
+        workers: int = 1,
+        embedding_provider: EmbeddingProvider | None = None,
+    ):
+        self.directory = directory
+        self.index_name = index_name
+        self.vector_db = vector_db
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.embedding_provider = embedding_provider
+
+        self.work_queue: queue.Queue[tuple[str, tuple[int, int]] | None] = (
+            queue.Queue()
+        )
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+        # path -> (signature, time first seen with that signature)
+        self._pending: dict[str, tuple[tuple[int, int], float]] = {}
+        # path -> signature at the time it was queued/indexed
+        self._queued: dict[str, tuple[int, int]] = {}
+        self._indexed: dict[str, tuple[int, int]] = {}
+
+        self._started_at = datetime.now(timezone.utc).isoformat()
+        # namespace -> lock held while indexing into it
+        self._namespace_locks: dict[str, threading.Lock] = {}
+        # namespace -> (recency, path) of the file last indexed into it
+        self._namespace_latest: dict[str, tuple[tuple[str, int], str]] = {}
+
+        self._in_progress: set[str] = set()
+        self._indexed_files = 0
+        self._superseded_files = 0
+        self._indexed_concepts = 0
+        self._failures: dict[str, str] = {}
+        self._last_indexed: str | None = None
+
+    def scan(self) -> dict[str, tuple[int, int]]:
+        """Return a (mtime_ns, size) signature for each Compendium file found."""
+        signatures = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(COMPENDIUM_SUFFIXES):
+                    stat = entry.stat()
+                    signatures[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return signatures
+
+    def mark_existing_as_indexed(self):
+        """Treat the files currently in the directory as already indexed."""
+        with self._lock:
+            self._indexed.update(self.scan())
+
+    def poll(self, now: float | None = None):
+        """
+        Scan the directory once, queueing any file whose signature has been
+        stable for at least `debounce` seconds and has not been indexed yet.
+        Newer files are queued first, so that older versions of the same
+        domain can be skipped.
+        """
+        if now is None:
+            now = time.monotonic()
+
+        signatures = self.scan()
+        with self._lock:
+            for path in list(self._pending):
+                if path not in signatures:
+                    del self._pending[path]
+
+            ready = []
+            for path, signature in signatures.items():
+                if signature in (self._indexed.get(path), self._queued.get(path)):
+                    continue
+
+                pending = self._pending.get(path)
+                if pending is None or pending[0] != signature:
+                    self._pending[path] = (signature, now)
+                elif now - pending[1] >= self.debounce:
+                    del self._pending[path]
+                    ready.append((path, signature))
+
+            ready.sort(key=lambda item: compendium_recency(*item), reverse=True)
+            for path, signature in ready:
+                self._queued[path] = signature
+                self.work_queue.put((path, signature))
+
+    def process_next(self, timeout: float | None = None) -> bool:
+        """
+        Take one file off the work queue and index it.
+        Returns False if the queue was empty or a stop was requested.
+        """
+        try:
+            item = self.work_queue.get(timeout=timeout)
+        except queue.Empty:
+            return False
+
+        try:
+            if item is None:
+                return False
+
+            path, signature = item
+            with self._lock:
+                self._in_progress.add(path)
+            try:
+                self._index_file(path, signature)
+            except Exception as e:
+                # Record the signature anyway, so that a broken file is only
+                # retried once it changes again
+                with self._lock:
+                    self._indexed[path] = signature
+                    self._failures[path] = str(e)
+                print(f"Error indexing '{path}': {e}")
+            finally:
+                with self._lock:
+                    self._in_progress.discard(path)
+                    if self._queued.get(path) == signature:
+                        del self._queued[path]
+            return True
+        finally:
+            self.work_queue.task_done()
+
+    def _index_file(self, path: str, signature: tuple[int, int]):
+        # A pickle must be loaded in full just to read its domain name, so load
+        # it once here and hand the Domain to the indexer
+        domain = None
+        if path.endswith(".compendium.pickle"):
+            domain = load_domain_from_pickle(path)
+            domain_name = domain.name
+        else:
+            domain_name = read_domain_name(path)
+        namespace = namespace_for_domain(domain_name)
+        recency = compendium_recency(path, signature)
+
+        with self._lock:
+            namespace_lock = self._namespace_locks.setdefault(
+                namespace, threading.Lock()
+            )
+
+        # Indexing clears the namespace first, so two files for the same
+        # namespace must never be indexed at the same time
+        with namespace_lock:
+            latest = self._namespace_latest.get(namespace)
+            if latest is not None and latest[1] != path and latest[0] > recency:
+                with self._lock:
+                    self._indexed[path] = signature
+                    self._superseded_files += 1
+                print(f"Skipping '{path}': '{latest[1]}' is newer.")
+                return
+
+            total_concepts = index_compendium(
+                compendium_file=path,
+                vector_db_type="pinecone",
+                index_name=self.index_name,
+                namespace_per_domain=True,
+                vector_db=self.vector_db,
+                embedding_provider=self.embedding_provider,
+                domain=domain,
+            )
+            self._namespace_latest[namespace] = (recency, path)
+
+        with self._lock:
+            self._indexed[path] = signature
+            self._indexed_files += 1
+            self._indexed_concepts += total_concepts
+            self._last_indexed = path
+            self._failures.pop(path, None)
+
+    def status(self) -> dict:
+        """Return a JSON-serializable snapshot of the watcher's state."""
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "index_name": self.index_name,
+                "started_at": self._started_at,
+                "pending": sorted(self._pending),
+                "queued": self.work_queue.qsize(),
+                "in_progress": sorted(self._in_progress),
+                "indexed_files": self._indexed_files,
+                "indexed_concepts": self._indexed_concepts,
+                "superseded_files": self._superseded_files,
+                "last_indexed": self._last_indexed,
+                "failures": dict(self._failures),
+            }
+
+    def start(self):
+        """Start the polling and worker threads."""
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(target=self._poll_loop, name="compendium-poller")
+        ]
+        for i in range(self.workers):
+            self._threads.append(
+                threading.Thread(target=self._work_loop, name=f"compendium-worker-{i}")
+            )
+        for thread in self._threads:
+            thread.daemon = True
+            thread.start()
+
+    def stop(self):
+        """Stop polling, let the workers finish their current file, and join."""
+        self._stop_event.set()
+        for _ in range(self.workers):
+            self.work_queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _poll_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except OSError as e:
+                print(f"Error scanning '{self.directory}': {e}")
+            self._stop_event.wait(self.poll_interval)
+
+    def _work_loop(self):
+        while not self._stop_event.is_set():
+            self.process_next()
+
+
+def create_status_server(
+    watcher: CompendiumWatcher, host: str = "127.0.0.1", port: int = 8765
+) -> ThreadingHTTPServer:
+    """
+    Create an HTTP server that reports the watcher's status as JSON on /status.
+    The caller is responsible for running serve_forever() and shutdown().
+    """
+
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/status"):
+                self.send_error(404)
+                return
+            body = json.dumps(watcher.status()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Keep the console for indexing output
+            pass
+
+    return ThreadingHTTPServer((host, port), StatusHandler)
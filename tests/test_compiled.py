@@ -0,0 +1,158 @@
+import pytest
+
+from compendiumscribe.model import Domain, Topic, Concept
+from compendiumkeeper.compiled import CompiledCompendium, write_compiled
+
+
+def make_domain():
+    domain = Domain(name="Cell Biology", summary="Cells")
+    topic1 = Topic(name="Organelles", topic_summary="Parts of a cell")
+    concept = Concept(name="Mitochondria")
+    concept.content = "The powerhouse of the cell"
+    concept.questions.append("What do mitochondria do?")
+    concept.keywords.extend(["ATP", "respiration"])
+    concept.prerequisites.append("Cells")
+    topic1.concepts.append(concept)
+    topic1.concepts.append(Concept(name="Ribosome"))
+    domain.topics.append(topic1)
+    topic2 = Topic(name="Division", topic_summary="How cells divide")
+    topic2.concepts.append(Concept(name="Mitosis"))
+    domain.topics.append(topic2)
+    return domain
+
+
+def test_compiled_round_trip(tmp_path):
+    compiled_file = tmp_path / "cell_biology.compendium.bin"
+    write_compiled(make_domain(), str(compiled_file))
+
+    with CompiledCompendium(str(compiled_file)) as compiled:
+        assert compiled.name == "Cell Biology"
+        assert compiled.summary == "Cells"
+        assert len(compiled) == 3
+        assert compiled.concept_ids() == [
+            "organelles_mitochondria",
+            "organelles_ribosome",
+            "division_mitosis",
+        ]
+
+        domain = compiled.to_domain()
+
+    assert [topic.name for topic in domain.topics] == ["Organelles", "Division"]
+    assert domain.topics[0].topic_summary == "Parts of a cell"
+    concept = domain.topics[0].concepts[0]
+    assert concept.name == "Mitochondria"
+    assert concept.content == "The powerhouse of the cell"
+    assert concept.questions == ["What do mitochondria do?"]
+    assert concept.keywords == ["ATP", "respiration"]
+    assert concept.prerequisites == ["Cells"]
+
+
+def test_compiled_random_access(tmp_path):
+    compiled_file = tmp_path / "cell_biology.compendium.bin"
+    write_compiled(make_domain(), str(compiled_file))
+
+    with CompiledCompendium(str(compiled_file)) as compiled:
+        assert "division_mitosis" in compiled
+        assert compiled.get_concept("division_mitosis").name == "Mitosis"
+
+        topics = list(compiled.iter_topics({"division_mitosis"}))
+        assert [topic.name for topic in topics] == ["Division"]
+        assert [c.name for c in topics[0].concepts] == ["Mitosis"]
+
+        with pytest.raises(KeyError):
+            compiled.get_concept("missing")
+
+
+def test_write_compiled_replaces_mapped_file(tmp_path):
+    """
+    Recompiling a file that is open elsewhere must not truncate it under the
+    reader's memory map.
+    """
+    compiled_file = tmp_path / "cell_biology.compendium.bin"
+    write_compiled(make_domain(), str(compiled_file))
+
+    with CompiledCompendium(str(compiled_file)) as old:
+        domain = make_domain()
+        domain.topics[0].concepts[0].content = "Makes ATP"
+        write_compiled(domain, str(compiled_file))
+
+        concept = old.get_concept("organelles_mitochondria")
+        assert concept.content == "The powerhouse of the cell"
+
+    with CompiledCompendium(str(compiled_file)) as new:
+        assert new.get_concept("organelles_mitochondria").content == "Makes ATP"
+    assert [p.name for p in tmp_path.iterdir()] == [compiled_file.name]
+
+
+def test_compiled_diff(tmp_path):
+    old_file = tmp_path / "old.compendium.bin"
+    new_file = tmp_path / "new.compendium.bin"
+    write_compiled(make_domain(), str(old_file))
+
+    domain = make_domain()
+    domain.topics[0].concepts[1].content = "Makes proteins"  # changed
+    domain.topics[1].concepts.pop()  # removed
+    domain.topics[1].concepts.append(Concept(name="Meiosis"))  # added
+    write_compiled(domain, str(new_file))
+
+    with CompiledCompendium(str(new_file)) as new, CompiledCompendium(
+        str(old_file)
+    ) as old:
+        changed, removed = new.diff(old)
+
+    assert changed == {"organelles_ribosome", "division_meiosis"}
+    assert removed == {"division_mitosis"}
+
+
+def test_compiled_diff_detects_topic_summary_change(tmp_path):
+    old_file = tmp_path / "old.compendium.bin"
+    new_file = tmp_path / "new.compendium.bin"
+    write_compiled(make_domain(), str(old_file))
+
+    domain = make_domain()
+    domain.topics[1].topic_summary = "How cells split"
+    write_compiled(domain, str(new_file))
+
+    with CompiledCompendium(str(new_file)) as new, CompiledCompendium(
+        str(old_file)
+    ) as old:
+        changed, removed = new.diff(old)
+
+    assert changed == {"division_mitosis"}
+    assert removed == set()
+
+
+def test_compiled_diff_ignores_prerequisites(tmp_path):
+    """Prerequisites are not embedded, so changing them needs no re-index."""
+    old_file = tmp_path / "old.compendium.bin"
+    new_file = tmp_path / "new.compendium.bin"
+    write_compiled(make_domain(), str(old_file))
+
+    domain = make_domain()
+    domain.topics[1].concepts[0].prerequisites.append("Ribosome")
+    write_compiled(domain, str(new_file))
+
+    with CompiledCompendium(str(new_file)) as new, CompiledCompendium(
+        str(old_file)
+    ) as old:
+        changed, removed = new.diff(old)
+        assert new.get_concept("division_mitosis").prerequisites == ["Ribosome"]
+
+    assert changed == set()
+    assert removed == set()
+
+
+def test_compiled_rejects_other_files(tmp_path):
+    bad_file = tmp_path / "bad.compendium.bin"
+    bad_file.write_bytes(b"not a compiled compendium at all")
+
+    with pytest.raises(RuntimeError):
+        CompiledCompendium(str(bad_file))
+
+
+def test_compiled_rejects_empty_file(tmp_path):
+    empty_file = tmp_path / "empty.compendium.bin"
+    empty_file.write_bytes(b"")
+
+    with pytest.raises(RuntimeError, match="empty.compendium.bin"):
+        CompiledCompendium(str(empty_file))
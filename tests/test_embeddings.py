@@ -0,0 +1,109 @@
+from unittest.mock import patch, MagicMock
+
+from compendiumkeeper.embeddings.local_provider import (
+    LocalEmbeddingProvider,
+    make_length_batches,
+)
+from compendiumkeeper.embeddings.openai_provider import (
+    OpenAIEmbeddingProvider,
+    make_request_batches,
+)
+
+
+def test_make_length_batches_groups_similar_lengths():
+    texts = ["a" * 10, "a" * 1, "a" * 100, "a" * 2, "a" * 90]
+    batches = make_length_batches(texts, max_batch_size=2, max_batch_chars=1000)
+
+    # Sorted by length, then split into batches of at most 2
+    assert batches == [[1, 3], [0, 4], [2]]
+
+
+def test_make_length_batches_respects_padded_size():
+    texts = ["a" * 10, "a" * 10, "a" * 10, "a" * 30]
+    batches = make_length_batches(texts, max_batch_size=64, max_batch_chars=40)
+
+    # Three 10-char texts pad to 30; adding the 30-char text would pad to 120
+    assert batches == [[0, 1, 2], [3]]
+
+
+def test_make_length_batches_empty():
+    assert make_length_batches([], max_batch_size=8, max_batch_chars=100) == []
+
+
+def test_local_provider_embed_restores_input_order():
+    """
+    Batches are encoded out of input order; embed() must put the results back.
+    """
+    provider = LocalEmbeddingProvider(workers=2, max_batch_size=2)
+    fake_pool = MagicMock()
+    fake_pool.map.side_effect = lambda fn, batches: [
+        ([[float(len(text))] for text in batch], 0) for batch in batches
+    ]
+    provider._pool = fake_pool
+
+    texts = ["ccc", "a", "bb", "dddd"]
+    embeddings = provider.embed(texts)
+
+    assert embeddings == [[3.0], [1.0], [2.0], [4.0]]
+    assert fake_pool.map.call_count == 1
+
+    provider.close()
+    fake_pool.shutdown.assert_called_once()
+    assert provider._pool is None
+
+
+def test_local_provider_embed_warns_about_truncation(capsys):
+    provider = LocalEmbeddingProvider(workers=1)
+    fake_pool = MagicMock()
+    fake_pool.map.side_effect = lambda fn, batches: [
+        ([[0.0] for _ in batch], len(batch)) for batch in batches
+    ]
+    provider._pool = fake_pool
+    provider._max_seq_length = 256
+
+    provider.embed(["long text", "another long text"])
+
+    output = capsys.readouterr().out
+    assert "2 of 2 texts exceed the 256-token limit" in output
+
+
+@patch("compendiumkeeper.embeddings.openai_provider.get_openai_client")
+def test_openai_provider_embed_batches_requests(mock_get_client):
+    mock_client = MagicMock()
+    mock_get_client.return_value = mock_client
+    mock_client.embeddings.create.side_effect = lambda model, input: MagicMock(
+        data=[MagicMock(embedding=[float(len(text))]) for text in input]
+    )
+
+    provider = OpenAIEmbeddingProvider()
+    provider.max_batch_size = 2
+    embeddings = provider.embed(["a", "bb", "ccc"])
+
+    assert embeddings == [[1.0], [2.0], [3.0]]
+    assert mock_client.embeddings.create.call_count == 2
+    assert provider.dimension == 1536
+
+
+def test_make_request_batches_respects_char_budget():
+    texts = ["a" * 40, "b" * 40, "c" * 40, "d" * 100, "e"]
+    batches = make_request_batches(texts, max_batch_size=10, max_batch_chars=100)
+
+    assert batches == [["a" * 40, "b" * 40], ["c" * 40], ["d" * 100], ["e"]]
+
+
+@patch("compendiumkeeper.embeddings.openai_provider.get_openai_client")
+def test_openai_provider_embed_splits_by_char_budget(mock_get_client):
+    mock_client = MagicMock()
+    mock_get_client.return_value = mock_client
+    mock_client.embeddings.create.side_effect = lambda model, input: MagicMock(
+        data=[MagicMock(embedding=[float(len(text))]) for text in input]
+    )
+
+    provider = OpenAIEmbeddingProvider()
+    provider.max_batch_chars = 10
+    texts = ["x" * 6, "y" * 6, "z" * 3]
+    embeddings = provider.embed(texts)
+
+    assert embeddings == [[6.0], [6.0], [3.0]]
+    sent = [c.kwargs["input"] for c in mock_client.embeddings.create.call_args_list]
+    assert sent == [["x" * 6], ["y" * 6, "z" * 3]]
@@ -2,14 +2,20 @@ import pytest
 import pickle
 import shutil
 import xml.etree.ElementTree as ET
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 
 from compendiumscribe.model import Domain, Topic, Concept
+from compendiumkeeper.compiled import write_compiled
+from compendiumkeeper.embeddings.local_provider import LocalEmbeddingProvider
 from compendiumkeeper.indexer import (
+    compile_compendium,
     index_compendium,
+    iter_concept_windows,
+    load_domain_from_compiled,
     load_domain_from_pickle,
     load_domain_from_xml,
 )
+from compendiumkeeper.utils import namespace_for_domain
 
 
 @pytest.fixture
@@ -116,6 +122,33 @@ def test_index_compendium_pickle(
     assert embed_call_count > 0  # ensures no real call to OpenAI was made
 
 
+@patch("compendiumkeeper.indexer.load_domain_from_pickle")
+@patch("compendiumkeeper.indexer.PineconeDB")
+@patch("compendiumkeeper.utils.get_embedding", return_value=[0.1, 0.2, 0.3])
+def test_index_compendium_preloaded_domain(
+    mock_get_embedding, mock_pinecone, mock_load_pickle, temp_dir
+):
+    """
+    Test that a Domain the caller has already loaded is indexed as is,
+    without reading the file again.
+    """
+    domain = Domain(name="Pickle Domain")
+    topic = Topic(name="Topic1")
+    topic.concepts.append(Concept(name="Concept1"))
+    domain.topics.append(topic)
+
+    total_concepts = index_compendium(
+        str(temp_dir / "test.compendium.pickle"),
+        vector_db_type="pinecone",
+        index_name="my_index",
+        domain=domain,
+    )
+
+    assert total_concepts == 1
+    mock_load_pickle.assert_not_called()
+    assert mock_pinecone.return_value.upsert_concept_embeddings.call_count == 1
+
+
 @patch("compendiumkeeper.indexer.load_domain_from_xml")
 @patch("compendiumkeeper.indexer.PineconeDB")
 @patch("compendiumkeeper.utils.get_embedding", return_value=[0.99, 0.98])
@@ -153,3 +186,275 @@ def test_index_compendium_xml(
 
     # Also ensure get_embedding was called
     assert mock_get_embedding.call_count > 0
+
+
+@patch("compendiumkeeper.indexer.load_domain_from_pickle")
+@patch("compendiumkeeper.indexer.PineconeDB")
+@patch("compendiumkeeper.utils.get_embedding", return_value=[0.1, 0.2, 0.3])
+def test_index_compendium_namespace_per_domain(
+    mock_get_embedding, mock_pinecone, mock_load_pickle, temp_dir
+):
+    """
+    Test index_compendium with namespace_per_domain.
+    Only the domain's namespace should be cleared, and every concept should be
+    upserted into that namespace.
+    """
+    domain = Domain(name="Cell Biology")
+    topic = Topic(name="Topic1")
+    topic.concepts.append(Concept(name="C1"))
+    topic.concepts.append(Concept(name="C2"))
+    domain.topics.append(topic)
+
+    mock_load_pickle.return_value = domain
+
+    pickle_file = temp_dir / "test.compendium.pickle"
+    pickle_file.touch()
+
+    index_compendium(
+        str(pickle_file),
+        vector_db_type="pinecone",
+        index_name="shared_index",
+        namespace_per_domain=True,
+    )
+
+    # The index must not be wiped as a whole
+    mock_pinecone.assert_called_once_with(
+        index_name="shared_index", clear_existing=False
+    )
+
+    pinecone_instance = mock_pinecone.return_value
+    namespace = namespace_for_domain("Cell Biology")
+    pinecone_instance.delete_namespace.assert_called_once_with(namespace)
+    assert pinecone_instance.upsert_concept_embeddings.call_count == 2
+    for _, kwargs in pinecone_instance.upsert_concept_embeddings.call_args_list:
+        assert kwargs["namespace"] == namespace
+
+
+@patch("compendiumkeeper.indexer.load_domain_from_xml")
+@patch("compendiumkeeper.indexer.PineconeDB")
+@patch("compendiumkeeper.utils.get_embedding")
+def test_index_compendium_with_embedding_provider(
+    mock_get_embedding, mock_pinecone, mock_load_xml, temp_dir
+):
+    """
+    Test index_compendium with an embedding provider.
+    The index should be created with the provider's dimension, and each topic
+    should be embedded in one provider call instead of through get_embedding.
+    """
+    domain = Domain(name="XML Domain")
+    topic = Topic(name="XML Topic")
+    topic.concepts.append(Concept(name="C1"))
+    topic.concepts.append(Concept(name="C2"))
+    domain.topics.append(topic)
+    mock_load_xml.return_value = domain
+
+    provider = MagicMock()
+    provider.dimension = 384
+    provider.embed.side_effect = lambda texts: [[0.5] for _ in texts]
+
+    xml_file = temp_dir / "test.compendium.xml"
+    xml_file.touch()
+
+    index_compendium(
+        str(xml_file),
+        vector_db_type="pinecone",
+        index_name="local_index",
+        embedding_provider=provider,
+    )
+
+    mock_pinecone.assert_called_once_with(index_name="local_index", dimension=384)
+    provider.embed.assert_called_once()
+    mock_get_embedding.assert_not_called()
+    assert mock_pinecone.return_value.upsert_concept_embeddings.call_count == 2
+
+
+@patch("compendiumkeeper.indexer.load_domain_from_xml")
+@patch("compendiumkeeper.indexer.PineconeDB")
+def test_index_compendium_embeds_across_topics(mock_pinecone, mock_load_xml, temp_dir):
+    """
+    Test that a multi-topic domain is embedded in one provider call, which the
+    local provider splits into many batches for its worker pool at once.
+    """
+    domain = Domain(name="XML Domain")
+    for t in range(3):
+        topic = Topic(name=f"Topic {t}", topic_summary="Summary")
+        for c in range(4):
+            topic.concepts.append(Concept(name=f"Concept {c}"))
+        domain.topics.append(topic)
+    mock_load_xml.return_value = domain
+
+    provider = LocalEmbeddingProvider(workers=4, max_batch_size=4)
+    provider._dimension = 384
+    fake_pool = MagicMock()
+    fake_pool.map.side_effect = lambda fn, batches: [
+        ([[0.5] for _ in batch], 0) for batch in batches
+    ]
+    provider._pool = fake_pool
+
+    xml_file = temp_dir / "test.compendium.xml"
+    xml_file.touch()
+
+    index_compendium(
+        str(xml_file),
+        vector_db_type="pinecone",
+        index_name="local_index",
+        embedding_provider=provider,
+    )
+
+    # 12 concepts x 2 texts each, in batches of 4, all submitted together
+    fake_pool.map.assert_called_once()
+    submitted_batches = fake_pool.map.call_args.args[1]
+    assert len(submitted_batches) == 6
+    assert mock_pinecone.return_value.upsert_concept_embeddings.call_count == 12
+
+
+def test_iter_concept_windows():
+    topics = []
+    for t in range(3):
+        topic = Topic(name=f"Topic {t}")
+        topic.concepts.extend(Concept(name=f"Concept {c}") for c in range(3))
+        topics.append(topic)
+
+    windows = list(iter_concept_windows(topics, window_size=4))
+
+    assert [len(window) for window in windows] == [4, 4, 1]
+    assert windows[1][0][2] == "Topic 1"
+
+
+def test_compile_compendium(temp_dir):
+    """
+    Test that compile_compendium writes a compiled file next to the input,
+    which loads back into the same Domain.
+    """
+    domain = Domain(name="Test Domain", summary="Just a test")
+    topic = Topic(name="Test Topic", topic_summary="Topic Summary")
+    topic.concepts.append(Concept(name="Test Concept"))
+    domain.topics.append(topic)
+
+    pickle_file = temp_dir / "test.compendium.pickle"
+    with open(pickle_file, "wb") as f:
+        pickle.dump(domain, f)
+
+    output_file = compile_compendium(str(pickle_file))
+    assert output_file == str(temp_dir / "test.compendium.bin")
+
+    loaded_domain = load_domain_from_compiled(output_file)
+    assert loaded_domain.name == "Test Domain"
+    assert loaded_domain.topics[0].topic_summary == "Topic Summary"
+    assert loaded_domain.topics[0].concepts[0].name == "Test Concept"
+
+
+@patch("compendiumkeeper.indexer.PineconeDB")
+@patch("compendiumkeeper.utils.get_embedding", return_value=[0.1, 0.2, 0.3])
+def test_index_compendium_incremental(mock_get_embedding, mock_pinecone, temp_dir):
+    """
+    Test incremental indexing against a previous compiled file.
+    Only changed concepts should be upserted. Afterwards, the stale vectors of
+    changed concepts and all vectors of removed concepts are deleted, without
+    clearing the namespace.
+    """
+    domain = Domain(name="Compiled Domain")
+    topic = Topic(name="Topic")
+    for name in ["Same", "Changed", "Removed"]:
+        topic.concepts.append(Concept(name=name))
+    domain.topics.append(topic)
+
+    previous_file = temp_dir / "old.compendium.bin"
+    write_compiled(domain, str(previous_file))
+
+    topic.concepts[1].content = "New content"
+    topic.concepts.pop()
+    current_file = temp_dir / "new.compendium.bin"
+    write_compiled(domain, str(current_file))
+
+    total_concepts = index_compendium(
+        str(current_file),
+        vector_db_type="pinecone",
+        index_name="shared_index",
+        namespace_per_domain=True,
+        previous_compendium_file=str(previous_file),
+    )
+
+    assert total_concepts == 1
+    pinecone_instance = mock_pinecone.return_value
+    pinecone_instance.delete_namespace.assert_not_called()
+
+    deletes = pinecone_instance.delete_concept_embeddings.call_args_list
+    assert [c.args[0] for c in deletes] == ["topic_changed", "topic_removed"]
+    assert deletes[0].kwargs["current_concept"].content == "New content"
+    assert "current_concept" not in deletes[1].kwargs
+
+    upserted = pinecone_instance.upsert_concept_embeddings.call_args_list
+    assert len(upserted) == 1
+    assert upserted[0].args[0]["concept_id"] == "topic_changed"
+    assert upserted[0].kwargs["namespace"] == namespace_for_domain("Compiled Domain")
+
+    # Nothing is deleted until the new vectors are in place
+    methods = [
+        name
+        for name, _, _ in pinecone_instance.mock_calls
+        if name in ("upsert_concept_embeddings", "delete_concept_embeddings")
+    ]
+    assert methods == [
+        "upsert_concept_embeddings",
+        "delete_concept_embeddings",
+        "delete_concept_embeddings",
+    ]
+
+
+@patch("compendiumkeeper.vector_db.pinecone_db.Pinecone")
+@patch("compendiumkeeper.utils.get_embedding", return_value=[0.1, 0.2, 0.3])
+def test_index_compendium_incremental_upsert_failure(
+    mock_get_embedding, mock_pinecone, temp_dir
+):
+    """
+    If an upsert fails during an incremental run, the error must reach the
+    caller and no vectors may be deleted.
+    """
+    mock_client = mock_pinecone.return_value
+    mock_client.list_indexes.return_value = ["shared_index"]
+    mock_client.describe_index.return_value.dimension = 1536
+    mock_index = mock_client.Index.return_value
+    mock_index.upsert.side_effect = Exception("quota exceeded")
+
+    domain = Domain(name="Compiled Domain")
+    topic = Topic(name="Topic")
+    for name in ["Changed", "Removed"]:
+        concept = Concept(name=name)
+        concept.questions.extend(["Q1", "Q2"])
+        topic.concepts.append(concept)
+    domain.topics.append(topic)
+
+    previous_file = temp_dir / "old.compendium.bin"
+    write_compiled(domain, str(previous_file))
+
+    topic.concepts[0].questions.pop()
+    topic.concepts.pop()
+    current_file = temp_dir / "new.compendium.bin"
+    write_compiled(domain, str(current_file))
+
+    with pytest.raises(RuntimeError, match="quota exceeded"):
+        index_compendium(
+            str(current_file),
+            vector_db_type="pinecone",
+            index_name="shared_index",
+            namespace_per_domain=True,
+            previous_compendium_file=str(previous_file),
+        )
+
+    mock_index.upsert.assert_called_once()
+    mock_index.delete.assert_not_called()
+
+
+def test_index_compendium_incremental_requires_compiled_files(temp_dir):
+    xml_file = temp_dir / "test.compendium.xml"
+    xml_file.write_text('<domain name="XML Domain"/>')
+
+    with pytest.raises(RuntimeError, match="requires compiled"):
+        index_compendium(
+            str(xml_file),
+            vector_db_type="pinecone",
+            index_name="shared_index",
+            namespace_per_domain=True,
+            previous_compendium_file=str(temp_dir / "old.compendium.bin"),
+        )
@@ -1,10 +1,14 @@
+import pytest
 from unittest.mock import patch, MagicMock
 
+from compendiumscribe.model import Concept
 from compendiumkeeper.utils import (
     get_openai_api_key,
     get_embedding,
+    get_embedding_data_batch,
     slugify,
     generate_concept_id,
+    namespace_for_domain,
 )
 
 
@@ -19,6 +23,26 @@ def test_generate_concept_id():
     assert id_value == "my_topic_my_concept"
 
 
+def test_namespace_for_domain():
+    assert namespace_for_domain("Cell Biology").startswith("cell_biology_")
+    assert namespace_for_domain("Django") == namespace_for_domain("Django")
+
+
+def test_namespace_for_domain_keeps_similar_names_apart():
+    namespaces = {namespace_for_domain(name) for name in ["C++", "C#", "C"]}
+    assert len(namespaces) == 3
+
+
+def test_namespace_for_domain_without_ascii_slug():
+    biology = namespace_for_domain("生物学")
+    assert biology.startswith("domain_")
+    assert biology != namespace_for_domain("Биология")
+
+    for name in ["", "   "]:
+        with pytest.raises(RuntimeError):
+            namespace_for_domain(name)
+
+
 def test_get_openai_api_key():
     """
     We rely on the mock_env fixture from conftest.py for env var setup.
@@ -46,3 +70,32 @@ def test_get_embedding(mock_openai):
     mock_instance.embeddings.create.assert_called_once_with(
         model="text-embedding-ada-002", input="test text"
     )
+
+
+def test_get_embedding_data_batch_with_provider():
+    """
+    All texts of all concepts, across topics, should be embedded in a single
+    provider call, and each embedding should be matched back to its text.
+    """
+    provider = MagicMock()
+    provider.embed.side_effect = lambda texts: [[float(len(t))] for t in texts]
+
+    concept1 = Concept(name="C1", content="Body", keywords=["k1", "kw2"])
+    concept2 = Concept(name="Concept2", questions=["Why?"])
+
+    results = get_embedding_data_batch(
+        [(concept1, "Summary", "Topic"), (concept2, "Other summary", "Other")],
+        embedding_provider=provider,
+    )
+
+    provider.embed.assert_called_once()
+    assert [r["concept_id"] for r in results] == ["topic_c1", "other_concept2"]
+
+    assert results[0]["name"] == ("C1", [2.0])
+    assert results[0]["content"] == ("Summary\n\nBody", [13.0])
+    assert results[0]["keywords"] == [("k1", [2.0]), ("kw2", [3.0])]
+    assert results[0]["combined_keywords"] == ("k1 kw2", [6.0])
+
+    assert results[1]["name"] == ("Concept2", [8.0])
+    assert results[1]["questions"] == [("Why?", [4.0])]
+    assert results[1]["combined_keywords"] is None
@@ -1,3 +1,4 @@
+import pytest
 from unittest.mock import patch, MagicMock, ANY, call
 
 from compendiumkeeper.vector_db.pinecone_db import PineconeDB
@@ -55,6 +56,7 @@ def test_pinecone_db_init__index_exists(mock_pinecone):
 
     # The index is found => clearing block triggers
     mock_client_instance.list_indexes.return_value = ["testindex"]
+    mock_client_instance.describe_index.return_value.dimension = 1536
 
     PineconeDB(index_name="testindex")
 
@@ -87,6 +89,7 @@ def test_pinecone_db_upsert(mock_pinecone):
 
     # Index found => clearing block triggers, then final usage
     mock_client_instance.list_indexes.return_value = ["testindex"]
+    mock_client_instance.describe_index.return_value.dimension = 1536
 
     db = PineconeDB(index_name="testindex")
 
@@ -131,3 +134,210 @@ def test_pinecone_db_upsert(mock_pinecone):
 
     for vector_id, vector_emb, metadata in vectors_list:
         assert metadata["concept_id"] == "topic_concept"
+
+
+@patch("compendiumkeeper.vector_db.pinecone_db.Pinecone")
+def test_pinecone_db_init__keep_existing(mock_pinecone):
+    """
+    Scenario: The index already exists and clear_existing=False.
+    We expect the host to be discovered, but no vectors to be deleted.
+    """
+    mock_client_instance = MagicMock()
+    mock_pinecone.return_value = mock_client_instance
+    mock_client_instance.list_indexes.return_value = ["testindex"]
+    mock_client_instance.describe_index.return_value.dimension = 1536
+
+    PineconeDB(index_name="testindex", clear_existing=False)
+
+    mock_client_instance.create_index.assert_not_called()
+    mock_client_instance.describe_index.assert_called_once_with("testindex")
+
+    # Only the final .Index(...) call, and nothing deleted
+    mock_client_instance.Index.assert_called_once_with(host=ANY)
+    mock_client_instance.Index.return_value.delete.assert_not_called()
+
+
+@patch("compendiumkeeper.vector_db.pinecone_db.Pinecone")
+def test_pinecone_db_upsert__namespace(mock_pinecone):
+    """
+    Test that upsert_concept_embeddings writes into the requested namespace.
+    """
+    mock_client_instance = MagicMock()
+    mock_pinecone.return_value = mock_client_instance
+    mock_client_instance.list_indexes.return_value = ["testindex"]
+    mock_client_instance.describe_index.return_value.dimension = 1536
+
+    db = PineconeDB(index_name="testindex", clear_existing=False)
+    mock_index = mock_client_instance.Index.return_value
+
+    embedding_data = {
+        "concept_id": "topic_concept",
+        "name": ("Concept Name", [0.1, 0.2]),
+        "content": ("Concept Content", [0.3, 0.4]),
+        "questions": [],
+        "keywords": [],
+        "combined_keywords": None,
+    }
+    db.upsert_concept_embeddings(embedding_data, namespace="cell_biology")
+
+    mock_index.upsert.assert_called_once_with(vectors=ANY, namespace="cell_biology")
+
+
+@patch("compendiumkeeper.vector_db.pinecone_db.Pinecone")
+def test_pinecone_db_query__multiple_namespaces(mock_pinecone):
+    """
+    Test that query fans out to every namespace and merges matches by score.
+    """
+    mock_client_instance = MagicMock()
+    mock_pinecone.return_value = mock_client_instance
+    mock_client_instance.list_indexes.return_value = ["testindex"]
+    mock_client_instance.describe_index.return_value.dimension = 1536
+
+    db = PineconeDB(index_name="testindex", clear_existing=False)
+    mock_index = mock_client_instance.Index.return_value
+
+    def fake_query(vector, top_k, namespace, include_metadata):
+        scores = {"django": [0.9, 0.5], "flask": [0.7, 0.3]}[namespace]
+        response = MagicMock()
+        response.matches = [
+            MagicMock(id=f"{namespace}_{i}", score=score, metadata={})
+            for i, score in enumerate(scores)
+        ]
+        return response
+
+    mock_index.query.side_effect = fake_query
+
+    matches = db.query([0.1, 0.2], top_k=3, namespaces=["django", "flask"])
+
+    assert mock_index.query.call_count == 2
+    assert [m["id"] for m in matches] == ["django_0", "flask_0", "django_1"]
+    assert [m["namespace"] for m in matches] == ["django", "flask", "django"]
+
+
+@patch("compendiumkeeper.vector_db.pinecone_db.Pinecone")
+def test_pinecone_db_query__duplicate_namespaces(mock_pinecone):
+    """
+    Test that a namespace listed twice is only queried once.
+    """
+    mock_client_instance = MagicMock()
+    mock_pinecone.return_value = mock_client_instance
+    mock_client_instance.list_indexes.return_value = ["testindex"]
+    mock_client_instance.describe_index.return_value.dimension = 1536
+
+    db = PineconeDB(index_name="testindex", clear_existing=False)
+    mock_index = mock_client_instance.Index.return_value
+    mock_index.query.return_value.matches = [
+        MagicMock(id="django_0", score=0.9, metadata={})
+    ]
+
+    matches = db.query([0.1, 0.2], top_k=5, namespaces=["django", "django"])
+
+    mock_index.query.assert_called_once()
+    assert [m["id"] for m in matches] == ["django_0"]
+
+
+@patch("compendiumkeeper.vector_db.pinecone_db.Pinecone")
+def test_pinecone_db_delete_namespace(mock_pinecone):
+    """
+    Test that delete_namespace deletes only the given namespace,
+    and skips namespaces that don't exist.
+    """
+    mock_client_instance = MagicMock()
+    mock_pinecone.return_value = mock_client_instance
+    mock_client_instance.list_indexes.return_value = ["testindex"]
+    mock_client_instance.describe_index.return_value.dimension = 1536
+
+    db = PineconeDB(index_name="testindex", clear_existing=False)
+    mock_index = mock_client_instance.Index.return_value
+    mock_index.describe_index_stats.return_value.namespaces = {"django": {}}
+
+    db.delete_namespace("flask")
+    mock_index.delete.assert_not_called()
+
+    db.delete_namespace("django")
+    mock_index.delete.assert_called_once_with(delete_all=True, namespace="django")
+
+
+@patch("compendiumkeeper.vector_db.pinecone_db.Pinecone")
+def test_pinecone_db_delete_concept_embeddings(mock_pinecone):
+    """
+    Test that delete_concept_embeddings deletes exactly the vector IDs
+    that upsert_concept_embeddings created for the concept.
+    """
+    mock_client_instance = MagicMock()
+    mock_pinecone.return_value = mock_client_instance
+    mock_client_instance.list_indexes.return_value = ["testindex"]
+    mock_client_instance.describe_index.return_value.dimension = 1536
+
+    db = PineconeDB(index_name="testindex", clear_existing=False)
+    mock_index = mock_client_instance.Index.return_value
+
+    concept = MagicMock(questions=["Q1", "Q2"], keywords=["keyword1"])
+    db.delete_concept_embeddings("topic_concept", concept, namespace="django")
+
+    mock_index.delete.assert_called_once_with(
+        ids=[
+            "topic_concept_name",
+            "topic_concept_content",
+            "topic_concept_question_0",
+            "topic_concept_question_1",
+            "topic_concept_keyword_0",
+            "topic_concept_combined_keywords",
+        ],
+        namespace="django",
+    )
+
+
+@patch("compendiumkeeper.vector_db.pinecone_db.Pinecone")
+def test_pinecone_db_delete_concept_embeddings__stale_only(mock_pinecone):
+    """
+    Test that, given the re-upserted version of a concept, only the vectors
+    it no longer has are deleted.
+    """
+    mock_client_instance = MagicMock()
+    mock_pinecone.return_value = mock_client_instance
+    mock_client_instance.list_indexes.return_value = ["testindex"]
+    mock_client_instance.describe_index.return_value.dimension = 1536
+
+    db = PineconeDB(index_name="testindex", clear_existing=False)
+    mock_index = mock_client_instance.Index.return_value
+
+    previous = MagicMock(questions=["Q1", "Q2", "Q3"], keywords=["keyword1"])
+    current = MagicMock(questions=["Q1"], keywords=[])
+    db.delete_concept_embeddings(
+        "topic_concept", previous, namespace="django", current_concept=current
+    )
+
+    mock_index.delete.assert_called_once_with(
+        ids=[
+            "topic_concept_question_1",
+            "topic_concept_question_2",
+            "topic_concept_keyword_0",
+            "topic_concept_combined_keywords",
+        ],
+        namespace="django",
+    )
+
+    # Nothing is stale if the concept kept all its vectors
+    mock_index.delete.reset_mock()
+    db.delete_concept_embeddings(
+        "topic_concept", current, namespace="django", current_concept=previous
+    )
+    mock_index.delete.assert_not_called()
+
+
+@patch("compendiumkeeper.vector_db.pinecone_db.Pinecone")
+def test_pinecone_db_init__dimension_mismatch(mock_pinecone):
+    """
+    Scenario: The index exists, but with a different dimension than the
+    embeddings. We expect an error, and no vectors to be deleted.
+    """
+    mock_client_instance = MagicMock()
+    mock_pinecone.return_value = mock_client_instance
+    mock_client_instance.list_indexes.return_value = ["testindex"]
+    mock_client_instance.describe_index.return_value.dimension = 1536
+
+    with pytest.raises(RuntimeError, match="dimension"):
+        PineconeDB(index_name="testindex", dimension=384)
+
+    mock_client_instance.Index.assert_not_called()
@@ -0,0 +1,268 @@
+import json
+import os
+import pickle
+import threading
+import time
+import urllib.request
+from unittest.mock import patch, MagicMock
+
+from compendiumscribe.model import Domain
+from compendiumkeeper.compiled import write_compiled
+from compendiumkeeper.indexer import load_domain_from_pickle
+from compendiumkeeper.watcher import CompendiumWatcher, create_status_server
+
+
+def make_watcher(directory, **kwargs):
+    return CompendiumWatcher(
+        directory=str(directory),
+        index_name="my_index",
+        vector_db=MagicMock(),
+        debounce=2.0,
+        **kwargs,
+    )
+
+
+def test_poll_debounces_new_files(tmp_path):
+    """
+    A new file should only be queued once it has been stable for the debounce
+    period, and only once.
+    """
+    (tmp_path / "django.compendium.xml").write_text("<domain/>")
+    (tmp_path / "notes.txt").write_text("ignored")
+    watcher = make_watcher(tmp_path)
+
+    watcher.poll(now=0.0)
+    assert watcher.work_queue.qsize() == 0
+
+    watcher.poll(now=1.0)
+    assert watcher.work_queue.qsize() == 0
+
+    watcher.poll(now=2.5)
+    assert watcher.work_queue.qsize() == 1
+
+    watcher.poll(now=5.0)
+    assert watcher.work_queue.qsize() == 1
+
+    path, _ = watcher.work_queue.get_nowait()
+    assert path == str(tmp_path / "django.compendium.xml")
+
+
+def test_poll_restarts_debounce_when_file_changes(tmp_path):
+    compendium_file = tmp_path / "django.compendium.xml"
+    compendium_file.write_text("<domain/>")
+    watcher = make_watcher(tmp_path)
+
+    watcher.poll(now=0.0)
+    compendium_file.write_text("<domain name='Django'/>")
+    watcher.poll(now=2.5)
+    assert watcher.work_queue.qsize() == 0
+
+    watcher.poll(now=5.0)
+    assert watcher.work_queue.qsize() == 1
+
+
+def test_mark_existing_as_indexed(tmp_path):
+    (tmp_path / "django.compendium.pickle").write_bytes(b"")
+    watcher = make_watcher(tmp_path)
+    watcher.mark_existing_as_indexed()
+
+    watcher.poll(now=0.0)
+    watcher.poll(now=5.0)
+    assert watcher.work_queue.qsize() == 0
+
+
+@patch("compendiumkeeper.watcher.index_compendium", return_value=3)
+def test_process_next_indexes_with_shared_vector_db(mock_index_compendium, tmp_path):
+    """
+    Queued files should be indexed into their own namespace, reusing the
+    watcher's vector DB client, and not be re-queued until they change.
+    """
+    compendium_file = tmp_path / "django.compendium.xml"
+    compendium_file.write_text('<domain name="Django"/>')
+    watcher = make_watcher(tmp_path)
+
+    watcher.poll(now=0.0)
+    watcher.poll(now=2.5)
+    assert watcher.process_next(timeout=0) is True
+
+    mock_index_compendium.assert_called_once_with(
+        compendium_file=str(compendium_file),
+        vector_db_type="pinecone",
+        index_name="my_index",
+        namespace_per_domain=True,
+        vector_db=watcher.vector_db,
+        embedding_provider=None,
+        domain=None,
+    )
+    status = watcher.status()
+    assert status["indexed_files"] == 1
+    assert status["indexed_concepts"] == 3
+    assert status["last_indexed"] == str(compendium_file)
+
+    watcher.poll(now=10.0)
+    watcher.poll(now=20.0)
+    assert watcher.work_queue.qsize() == 0
+
+    # Changing the file makes it eligible again
+    stat = compendium_file.stat()
+    os.utime(compendium_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    watcher.poll(now=30.0)
+    watcher.poll(now=32.5)
+    assert watcher.work_queue.qsize() == 1
+
+
+@patch(
+    "compendiumkeeper.watcher.index_compendium", side_effect=RuntimeError("bad file")
+)
+def test_process_next_records_failures(mock_index_compendium, tmp_path):
+    compendium_file = tmp_path / "django.compendium.xml"
+    compendium_file.write_text('<domain name="Django"/>')
+    watcher = make_watcher(tmp_path)
+
+    watcher.poll(now=0.0)
+    watcher.poll(now=2.5)
+    watcher.process_next(timeout=0)
+
+    status = watcher.status()
+    assert status["indexed_files"] == 0
+    assert status["failures"] == {str(compendium_file): "bad file"}
+
+    # A broken file is not retried until it changes
+    watcher.poll(now=10.0)
+    watcher.poll(now=20.0)
+    assert watcher.work_queue.qsize() == 0
+
+
+@patch("compendiumkeeper.watcher.index_compendium", return_value=0)
+def test_process_next_indexes_compiled_files(mock_index_compendium, tmp_path):
+    compendium_file = tmp_path / "django.compendium.bin"
+    write_compiled(Domain(name="Django"), str(compendium_file))
+    watcher = make_watcher(tmp_path)
+
+    watcher.poll(now=0.0)
+    watcher.poll(now=2.5)
+    assert watcher.process_next(timeout=0) is True
+
+    assert mock_index_compendium.call_args.kwargs["compendium_file"] == str(
+        compendium_file
+    )
+    assert watcher.status()["failures"] == {}
+
+
+@patch("compendiumkeeper.watcher.index_compendium", return_value=0)
+def test_process_next_loads_pickle_files_once(mock_index_compendium, tmp_path):
+    """
+    A pickle is loaded once to find its namespace, and the loaded Domain is
+    passed to the indexer instead of the file being unpickled again.
+    """
+    compendium_file = tmp_path / "django.compendium.pickle"
+    with open(compendium_file, "wb") as f:
+        pickle.dump(Domain(name="Django"), f)
+    watcher = make_watcher(tmp_path)
+
+    watcher.poll(now=0.0)
+    watcher.poll(now=2.5)
+    with patch(
+        "compendiumkeeper.watcher.load_domain_from_pickle",
+        wraps=load_domain_from_pickle,
+    ) as mock_load:
+        watcher.process_next(timeout=0)
+
+    mock_load.assert_called_once_with(str(compendium_file))
+    assert mock_index_compendium.call_args.kwargs["domain"].name == "Django"
+    assert watcher.status()["failures"] == {}
+
+
+def write_dated_compendium(directory, date, mtime):
+    compendium_file = directory / f"django_{date}.compendium.xml"
+    compendium_file.write_text('<domain name="Django"/>')
+    os.utime(compendium_file, (mtime, mtime))
+    return compendium_file
+
+
+@patch("compendiumkeeper.watcher.index_compendium", return_value=1)
+def test_newest_file_for_a_domain_wins(mock_index_compendium, tmp_path):
+    """
+    With two dated files for the same domain, the newer one should be indexed
+    and the older one skipped, whatever order they are found in.
+    """
+    # The older file has the newer mtime, so the filename date must decide
+    write_dated_compendium(tmp_path, "2024-12-01", 2_000_000)
+    newer = write_dated_compendium(tmp_path, "2024-12-10", 1_000_000)
+    watcher = make_watcher(tmp_path)
+
+    watcher.poll(now=0.0)
+    watcher.poll(now=2.5)
+    while watcher.process_next(timeout=0):
+        pass
+
+    indexed = [c.kwargs["compendium_file"] for c in mock_index_compendium.call_args_list]
+    assert indexed == [str(newer)]
+    status = watcher.status()
+    assert status["superseded_files"] == 1
+    assert status["failures"] == {}
+
+    # Neither file is queued again
+    watcher.poll(now=10.0)
+    watcher.poll(now=20.0)
+    assert watcher.work_queue.qsize() == 0
+
+
+def test_same_domain_is_never_indexed_concurrently(tmp_path):
+    """
+    Two workers must not index files for the same namespace at the same time,
+    and the newer file must be the last one indexed.
+    """
+    older = write_dated_compendium(tmp_path, "2024-12-01", 1_000_000)
+    newer = write_dated_compendium(tmp_path, "2024-12-10", 1_000_000)
+    watcher = make_watcher(tmp_path, workers=2)
+
+    active = []
+    overlaps = []
+    indexed = []
+
+    def fake_index_compendium(compendium_file, **kwargs):
+        active.append(compendium_file)
+        if len(active) > 1:
+            overlaps.append(list(active))
+        time.sleep(0.05)
+        indexed.append(compendium_file)
+        active.remove(compendium_file)
+        return 1
+
+    # Queue the older file first, as a slow scan might
+    for path in [older, newer]:
+        stat = path.stat()
+        watcher.work_queue.put((str(path), (stat.st_mtime_ns, stat.st_size)))
+
+    with patch(
+        "compendiumkeeper.watcher.index_compendium", side_effect=fake_index_compendium
+    ):
+        workers = [
+            threading.Thread(target=watcher.process_next, kwargs={"timeout": 1})
+            for _ in range(2)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    assert overlaps == []
+    assert indexed[-1] == str(newer)
+
+
+def test_status_server(tmp_path):
+    watcher = make_watcher(tmp_path)
+    server = create_status_server(watcher, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/status") as response:
+            status = json.loads(response.read())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert status["index_name"] == "my_index"
+    assert status["indexed_files"] == 0